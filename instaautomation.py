@@ -1,12 +1,19 @@
 import os
+import re
+import json
+import hashlib
+import signal
 import time
 import random
 import threading
+import queue
 import requests
-from flask import Flask
-from instagrapi import Client
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackContext, CallbackQueryHandler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, request
+from waitress import serve
+from telegram import Update
+from telegram.ext import Updater, CommandHandler, CallbackContext
 
 # ==========================
 # CONFIGURATION
@@ -15,7 +22,19 @@ BOT_TOKEN = os.getenv("BOT_TOKEN", "YOUR_TELEGRAM_BOT_TOKEN_HERE")
 INSTAGRAM_USERNAME = os.getenv("IG_USERNAME", "your_ig_username")
 INSTAGRAM_PASSWORD = os.getenv("IG_PASSWORD", "your_ig_password")
 MY_RENDER_URL = os.getenv("MY_RENDER_URL", "https://yourapp.onrender.com")
-VIDEO_DIR = "videos"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # optional, enables webhook mode
+PORT = int(os.getenv("PORT", "10000"))
+# Set VIDEO_DIR=/dev/shm/videos to keep clips in RAM. tmpfs counts against
+# the container's memory limit and survives restarts, so it gets a much
+# smaller default cap than disk.
+VIDEO_DIR = os.getenv("VIDEO_DIR", "videos")
+_video_dir_default_cap = "100000000" if VIDEO_DIR.startswith("/dev/shm") else "500000000"
+VIDEO_DIR_MAX_BYTES = int(os.getenv("VIDEO_DIR_MAX_BYTES", _video_dir_default_cap))  # 100 MB on tmpfs, else 500 MB
+SESSION_FILE = "ig_session.json"
+UID_CACHE_FILE = "uid_cache.json"
+POSTED_FILE = "posted.json"
+SEEN_HASHES_FILE = "seen_hashes.json"
+POSTED_MAX = 1000  # most recent media pks remembered as already posted
 AUTOZ_INTERVAL = int(os.getenv("AUTOZ_INTERVAL", "900"))  # default 15 min
 ADMIN_CHAT_ID = int(os.getenv("ADMIN_CHAT_ID", "0"))  # optional
 
@@ -30,136 +49,477 @@ bot_status = {
     "is_running": False
 }
 
+# ==========================
+# JSON STATE FILES
+# ==========================
+def load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+def save_json(path, obj):
+    # Write to a temp file and rename so a crash never leaves a torn file
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+# Shared HTTP session so pings reuse one keep-alive connection
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+
 # ==========================
 # KEEP ALIVE PING THREAD
 # ==========================
 def keep_alive_ping():
     while True:
         try:
-            res = requests.get(MY_RENDER_URL)
+            # HEAD is enough to keep Render awake; Flask answers it for GET routes
+            res = SESSION.head(MY_RENDER_URL, timeout=15, allow_redirects=False)
             bot_status["last_ping"] = time.strftime("%H:%M:%S")
             print(f"🔁 Keep-alive ping sent ({res.status_code}) to {MY_RENDER_URL}")
         except Exception as e:
             bot_status["last_error"] = f"Ping Error: {e}"
             print(f"⚠️ Keep-alive error: {e}")
-        time.sleep(bot_status["ping_interval"])  # default every 10 min
+        # default every 10 min, jittered ±10% so instances don't ping in lockstep
+        time.sleep(bot_status["ping_interval"] * random.uniform(0.9, 1.1))
 
 threading.Thread(target=keep_alive_ping, daemon=True).start()
 
 # ==========================
 # LOGIN FUNCTION
 # ==========================
-def ig_login():
+_ig_client = None
+_ig_lock = threading.Lock()  # guards _ig_client and serializes every call on it
+_ig_settings_hash = None  # hash of the settings last read from / written to SESSION_FILE
+
+def _settings_hash(cl):
+    blob = json.dumps(cl.get_settings(), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def save_ig_settings(cl):
+    # Most calls leave cookies and tokens untouched; only rewrite the
+    # session file when something actually changed
+    global _ig_settings_hash
+    h = _settings_hash(cl)
+    if h != _ig_settings_hash:
+        cl.dump_settings(SESSION_FILE)
+        _ig_settings_hash = h
+
+def _new_ig_client():
+    # instagrapi pulls in a large dependency tree; load it on first login,
+    # not at boot, so the web port binds quickly on cold starts
+    from instagrapi import Client
+    from instagrapi.exceptions import LoginRequired
+    global _ig_settings_hash
     cl = Client()
-    session_file = "ig_session.json"
     try:
-        if os.path.exists(session_file):
-            cl.load_settings(session_file)
+        try:
+            cl.load_settings(SESSION_FILE)
+            _ig_settings_hash = _settings_hash(cl)
+        except FileNotFoundError:
             cl.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-            print("✅ Reused Instagram session")
         else:
-            cl.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD)
-            cl.dump_settings(session_file)
-            print("✅ Logged in and saved new session")
+            try:
+                cl.get_timeline_feed()  # cheap check that the saved cookies still work
+                save_ig_settings(cl)
+                print("✅ Reused Instagram session")
+                return cl
+            except LoginRequired:
+                print("⚠️ Saved Instagram session expired, logging in again")
+                cl.login(INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, relogin=True)
+        save_ig_settings(cl)
+        print("✅ Logged in and saved new session")
         return cl
     except Exception as e:
         print(f"⚠️ Instagram login failed: {e}")
         bot_status["last_error"] = str(e)
         return None
 
+def ig_login():
+    global _ig_client
+    # Fast path: once logged in, hand out the shared client without locking
+    cl = _ig_client
+    if cl:
+        return cl
+    with _ig_lock:
+        if _ig_client is None:
+            _ig_client = _new_ig_client()
+        return _ig_client
+
+def drop_ig_client(cl):
+    # Forget a client whose session Instagram rejected; the next
+    # ig_login() call logs in again. Only drop it if nobody already has.
+    global _ig_client
+    with _ig_lock:
+        if _ig_client is cl:
+            _ig_client = None
+
 # ==========================
 # DOWNLOAD RANDOM VIDEO
 # ==========================
-def download_random_video(username):
+MEDIA_TTL = 900  # seconds a target's video list is reused
+TARGET_CACHE_MAX = 100  # usernames kept in the uid and media caches
+_uid_cache = load_json(UID_CACHE_FILE, {})  # username -> user id (stable, never expires)
+_media_cache = {}  # username -> (expires_at, videos)
+
+def get_target_videos(cl, username):
+    from instagrapi.exceptions import LoginRequired
+    now = time.time()
+    ent = _media_cache.get(username)
+    if ent and ent[0] > now:
+        return ent[1]
+    uid = _uid_cache.get(username)
+    if uid is None:
+        with _ig_lock:
+            uid = _uid_cache[username] = cl.user_id_from_username(username)
+            if len(_uid_cache) > TARGET_CACHE_MAX:
+                del _uid_cache[next(iter(_uid_cache))]  # oldest first
+            # Under the lock: prefetch and autoz threads share the .tmp file
+            save_json(UID_CACHE_FILE, _uid_cache)
+    try:
+        # Reels endpoint only returns videos, so no slots go to photos
+        with _ig_lock:
+            vids = cl.user_clips_v1(uid, amount=12)
+    except LoginRequired:
+        raise  # the fallback would fail the same way; let the caller relogin
+    except Exception as e:
+        print(f"[⚠️] user_clips_v1 failed for {username}, falling back: {e}")
+        vids = []
+    if not vids:
+        # user_clips_v1 swallows most errors and returns [], and accounts
+        # without reels return [] too; use private API (v1) media instead
+        with _ig_lock:
+            medias = cl.user_medias_v1(uid, amount=30)
+        vids = [m for m in medias if getattr(m, "video_url", None)]
+    with _ig_lock:
+        _media_cache.pop(username, None)
+        _media_cache[username] = (now + MEDIA_TTL, vids)
+        if len(_media_cache) > TARGET_CACHE_MAX:
+            del _media_cache[next(iter(_media_cache))]
+    return vids
+
+def prefetch_target(username):
+    # Warm the uid and clip list so the first autoz cycle skips both lookups
     cl = ig_login()
     if not cl:
-        return False, "Login failed"
+        return
     try:
-        # Use private API (v1) to fetch user media safely
-        uid = cl.user_id_from_username(username)
-        medias = cl.user_medias_v1(uid, amount=30)
+        vids = get_target_videos(cl, username)
+        print(f"🔎 Prefetched {len(vids)} videos for @{username}")
     except Exception as e:
-        print(f"[⚠️] user_medias_v1 failed for {username}: {e}")
-        medias = []
+        print(f"[⚠️] Prefetch failed for {username}: {e}")
 
-    vids = [m for m in medias if getattr(m, "video_url", None)]
-    if not vids:
-        return False, "No videos found"
+def cleanup_old_videos(keep=None, max_bytes=None):
+    # Render's disk is small and ephemeral: evict the oldest clips until
+    # VIDEO_DIR is back under its cap, never touching the one just fetched
+    # or any clip (and thumbnail) still waiting on the upload worker
+    max_bytes = VIDEO_DIR_MAX_BYTES if max_bytes is None else max_bytes
+    spare = {os.path.basename(p) for p in set(_inflight_paths)}
+    if keep:
+        spare.add(os.path.basename(keep))
+    spare |= {f"{n}.jpg" for n in spare}
+    files = []
+    try:
+        with os.scandir(VIDEO_DIR) as it:
+            for e in it:
+                if e.is_file() and e.name not in spare:
+                    st = e.stat()
+                    files.append((st.st_mtime, st.st_size, e.path))
+    except FileNotFoundError:
+        return
+    total = sum(f[1] for f in files)
+    if keep:
+        try:
+            total += os.path.getsize(keep)
+        except OSError:
+            pass
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        print(f"🧹 Removed old video {path}")
+
+_posted_order = load_json(POSTED_FILE, [])[-POSTED_MAX:]  # oldest first
+_posted_pks = set(_posted_order)
+# Queued or uploading: video_download names files by pk, so picking one of
+# these again would overwrite the clip under the pending upload
+_inflight_pks = set()
+_inflight_paths = set()  # their files, which cleanup_old_videos must not evict
+
+def mark_posted(pk):
+    pk = str(pk)
+    if pk in _posted_pks:
+        return
+    _posted_order.append(pk)
+    _posted_pks.add(pk)
+    if len(_posted_order) > POSTED_MAX:
+        _posted_pks.discard(_posted_order.pop(0))
+    save_json(POSTED_FILE, _posted_order)
+
+# Reposts of the same reel come back under new pks, so also remember
+# what was posted by content
+_seen_order = load_json(SEEN_HASHES_FILE, [])[-POSTED_MAX:]  # oldest first
+_seen_hashes = set(_seen_order)
+
+def video_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def mark_seen(digest):
+    if digest in _seen_hashes:
+        return
+    _seen_order.append(digest)
+    _seen_hashes.add(digest)
+    if len(_seen_order) > POSTED_MAX:
+        _seen_hashes.discard(_seen_order.pop(0))
+    save_json(SEEN_HASHES_FILE, _seen_order)
 
-    ch = random.choice(vids)
-    os.makedirs(VIDEO_DIR, exist_ok=True)
-    video_path = cl.video_download(ch.pk, folder=VIDEO_DIR)
-    return True, video_path
+def download_random_video(username, relogin=True):
+    cl = ig_login()
+    if not cl:
+        return False, "Login failed", None
+    from instagrapi.exceptions import LoginRequired
+    # With the media list cached, video_download (via media_info) is often
+    # the only Instagram call in a cycle, so it needs the relogin path too
+    try:
+        try:
+            vids = get_target_videos(cl, username)
+        except LoginRequired:
+            raise
+        except Exception as e:
+            print(f"[⚠️] Media fetch failed for {username}: {e}")
+            vids = []
+
+        vids = [m for m in vids if str(m.pk) not in _posted_pks and str(m.pk) not in _inflight_pks]
+        if not vids:
+            return False, "No new videos found", None
+
+        ch = random.choice(vids)
+        os.makedirs(VIDEO_DIR, exist_ok=True)
+        with _ig_lock:
+            video_path = cl.video_download(ch.pk, folder=VIDEO_DIR)
+    except LoginRequired:
+        drop_ig_client(cl)
+        if relogin:
+            print("⚠️ Instagram session expired, logging in again")
+            return download_random_video(username, relogin=False)
+        return False, "Instagram login required", None
+    cleanup_old_videos(keep=video_path)
+    return True, video_path, ch.pk
+
+# ==========================
+# UPLOAD WORKER
+# ==========================
+UPLOAD_RETRIES = 3
+# Downloads and uploads share _ig_lock, so they run one at a time; the
+# queue just keeps the next clip ready for when the upload finishes
+UPLOAD_QUEUE_SIZE = 2
+_upload_q = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+
+def post_to_instagram(path, caption, relogin=True):
+    cl = ig_login()
+    if not cl:
+        return False
+    from instagrapi.exceptions import LoginRequired
+    try:
+        # One Client is shared by the autoz and upload threads; an upload
+        # racing a download can tear its cookies/settings mid-request
+        with _ig_lock:
+            cl.clip_upload(path, caption=caption)
+            save_ig_settings(cl)  # keep any refreshed tokens
+        return True
+    except LoginRequired as e:
+        drop_ig_client(cl)
+        if relogin:
+            print("⚠️ Instagram session expired, logging in again")
+            return post_to_instagram(path, caption, relogin=False)
+        bot_status["last_error"] = f"Upload Error: {e}"
+        print(f"⚠️ Upload failed for {path}: {e}")
+        return False
+    except Exception as e:
+        bot_status["last_error"] = f"Upload Error: {e}"
+        print(f"⚠️ Upload failed for {path}: {e}")
+        return False
+
+def remove_video(path):
+    # clip_upload renders a "<clip>.jpg" thumbnail next to the clip
+    for p in (path, f"{path}.jpg"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+def upload_worker():
+    # Single consumer: a failing upload backs off here instead of
+    # stalling the autoz loop that feeds the queue.
+    while True:
+        path, caption, pk = _upload_q.get()
+        try:
+            try:
+                digest = video_digest(path)
+            except OSError as e:
+                print(f"⚠️ Could not hash {path}: {e}")
+                digest = None
+            if digest in _seen_hashes:
+                # Same bytes already went up under another pk; skip the upload
+                # and retire this pk so it isn't picked again
+                print(f"♻️ Skipping duplicate video {path}")
+                mark_posted(pk)
+                continue
+            for attempt in range(UPLOAD_RETRIES):
+                if post_to_instagram(path, caption):
+                    mark_posted(pk)
+                    if digest:
+                        mark_seen(digest)
+                    bot_status["videos_posted"] += 1
+                    bot_status["last_post_time"] = time.strftime("%H:%M:%S")
+                    bot_status["last_error"] = None
+                    print("📤 Posted to Instagram")
+                    break
+                if attempt < UPLOAD_RETRIES - 1:
+                    time.sleep(2 ** attempt * 5)
+            else:
+                print(f"❌ Giving up on {path} after {UPLOAD_RETRIES} attempts")
+        except Exception as e:
+            # e.g. save_json hitting ENOSPC; this is the only consumer, so
+            # it must survive or the queue stays full until a restart
+            bot_status["last_error"] = f"Upload Error: {e}"
+            print(f"❌ Upload worker error on {path}: {e}")
+        finally:
+            # Autoz clips are one-shot: drop them whether or not they posted
+            remove_video(path)
+            _inflight_pks.discard(str(pk))
+            _inflight_paths.discard(path)
+            _upload_q.task_done()
+
+threading.Thread(target=upload_worker, daemon=True).start()
 
 # ==========================
 # AUTOZ WORKER
 # ==========================
 AUTOZ_TARGET = None
 AUTOZ_RUNNING = False
+AUTOZ_WAKE = threading.Event()  # set by /stop_auto and /setinterval to cut a wait short
+_autoz_thread = None
+_autoz_lock = threading.Lock()
+AUTOZ_MIN_INTERVAL = 60  # skip cycles make no network call; don't let them spin
+
+def wait_next_cycle(started):
+    # Re-read the interval on every wake so /setinterval applies to the
+    # wait already in progress, not just the next one
+    while AUTOZ_RUNNING:
+        interval = max(bot_status["next_post_in"], AUTOZ_MIN_INTERVAL)
+        remaining = started + interval - time.monotonic()
+        if remaining <= 0:
+            return
+        AUTOZ_WAKE.wait(remaining)
+        AUTOZ_WAKE.clear()
+
+AUTOZ_BACKOFF_MIN = 30
+AUTOZ_BACKOFF_MAX = 3600
+
+def wait_backoff(delay):
+    # Unlike wait_next_cycle, /setinterval must not cut this short: only a
+    # /stop_auto (AUTOZ_RUNNING cleared) ends an error backoff early
+    deadline = time.monotonic() + delay
+    while AUTOZ_RUNNING:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        AUTOZ_WAKE.wait(remaining)
+        AUTOZ_WAKE.clear()
 
 def autoz_worker():
-    global AUTOZ_RUNNING
-    AUTOZ_RUNNING = True
     bot_status["is_running"] = True
+    backoff = AUTOZ_BACKOFF_MIN
     while AUTOZ_RUNNING:
+        started = time.monotonic()
         try:
-            if AUTOZ_TARGET:
-                ok, msg = download_random_video(AUTOZ_TARGET)
+            if not AUTOZ_TARGET:
+                print("⚠️ No target set for autozmode.")
+            elif _upload_q.full():
+                # Backpressure: don't download more than the uploader can take
+                bot_status["last_error"] = "Upload queue full"
+                print("⚠️ Upload queue full, skipping this cycle")
+            else:
+                ok, msg, pk = download_random_video(AUTOZ_TARGET)
                 if ok:
-                    print(f"✅ Downloaded and posting: {msg}")
-                    cl = ig_login()
-                    if cl:
-                        cl.clip_upload(msg, caption=f"Autoz repost from @{AUTOZ_TARGET}")
-                        bot_status["videos_posted"] += 1
-                        bot_status["last_post_time"] = time.strftime("%H:%M:%S")
-                        bot_status["last_error"] = None
-                        print("📤 Posted to Instagram")
+                    print(f"✅ Downloaded, queued for upload: {msg}")
+                    _inflight_pks.add(str(pk))
+                    _inflight_paths.add(msg)
+                    _upload_q.put_nowait((msg, f"Autoz repost from @{AUTOZ_TARGET}", pk))
                 else:
                     bot_status["last_error"] = msg
                     print(f"⚠️ {msg}")
-            else:
-                print("⚠️ No target set for autozmode.")
-            time.sleep(bot_status["next_post_in"])
+            backoff = AUTOZ_BACKOFF_MIN
+            wait_next_cycle(started)
         except Exception as e:
             bot_status["last_error"] = str(e)
-            print(f"❌ Autoz error: {e}")
-            time.sleep(600)  # wait 10 min before retry
+            # One-off errors retry quickly; repeated ones (rate limits) back
+            # off exponentially, jittered so restarts don't retry in lockstep
+            delay = backoff + random.uniform(0, backoff * 0.3)
+            print(f"❌ Autoz error: {e} (retrying in {delay:.0f}s)")
+            wait_backoff(delay)
+            backoff = min(backoff * 2, AUTOZ_BACKOFF_MAX)
     bot_status["is_running"] = False
 
 # ==========================
 # TELEGRAM BOT COMMANDS
 # ==========================
+USERNAME_RE = re.compile(r"@?([A-Za-z0-9._]{1,30})")
+
+HELP_TEXT = (
+    "🤖 *InstaAutomation Bot is Active!*\n"
+    "Commands:\n"
+    "/settarget <username> — Set target Instagram\n"
+    "/start_auto — Start auto repost\n"
+    "/stop_auto — Stop auto repost\n"
+    "/setinterval <seconds> — Change posting interval\n"
+    "/status — Show current bot status\n"
+    "/ping — Check ping status\n"
+)
+
 def start(update: Update, context: CallbackContext):
-    update.message.reply_text(
-        "🤖 *InstaAutomation Bot is Active!*\n"
-        "Commands:\n"
-        "/settarget <username> — Set target Instagram\n"
-        "/start_auto — Start auto repost\n"
-        "/stop_auto — Stop auto repost\n"
-        "/setinterval <seconds> — Change posting interval\n"
-        "/status — Show current bot status\n"
-        "/ping — Check ping status\n",
-        parse_mode="Markdown"
-    )
+    update.message.reply_text(HELP_TEXT, parse_mode="Markdown")
 
 def settarget(update: Update, context: CallbackContext):
     global AUTOZ_TARGET
-    if len(context.args) == 0:
+    m = USERNAME_RE.fullmatch(context.args[0]) if context.args else None
+    if not m:
         update.message.reply_text("⚠️ Usage: /settarget <username>")
         return
-    AUTOZ_TARGET = context.args[0]
+    AUTOZ_TARGET = m.group(1)
+    threading.Thread(target=prefetch_target, args=(AUTOZ_TARGET,), daemon=True).start()
     update.message.reply_text(f"🎯 Target set to: {AUTOZ_TARGET}")
 
 def start_auto(update: Update, context: CallbackContext):
+    global AUTOZ_RUNNING, _autoz_thread
     if not AUTOZ_TARGET:
         update.message.reply_text("⚠️ Set a target first using /settarget <username>")
         return
-    threading.Thread(target=autoz_worker, daemon=True).start()
+    with _autoz_lock:
+        AUTOZ_RUNNING = True
+        # Reuse the live worker instead of spawning one per /start_auto
+        if _autoz_thread is None or not _autoz_thread.is_alive():
+            _autoz_thread = threading.Thread(target=autoz_worker, daemon=True)
+            _autoz_thread.start()
     update.message.reply_text("🚀 Autoz Mode Started!")
 
 def stop_auto(update: Update, context: CallbackContext):
     global AUTOZ_RUNNING
     AUTOZ_RUNNING = False
+    AUTOZ_WAKE.set()
     update.message.reply_text("🛑 Autoz Mode Stopped!")
 
 def setinterval(update: Update, context: CallbackContext):
@@ -168,59 +528,113 @@ def setinterval(update: Update, context: CallbackContext):
         return
     try:
         sec = int(context.args[0])
-        bot_status["next_post_in"] = sec
-        update.message.reply_text(f"⏱ Interval set to {sec} seconds.")
-    except:
+    except ValueError:
         update.message.reply_text("⚠️ Invalid input.")
+        return
+    if sec < AUTOZ_MIN_INTERVAL:
+        update.message.reply_text(f"⚠️ Interval must be at least {AUTOZ_MIN_INTERVAL} seconds.")
+        return
+    bot_status["next_post_in"] = sec
+    AUTOZ_WAKE.set()
+    update.message.reply_text(f"⏱ Interval set to {sec} seconds.")
 
 def status(update: Update, context: CallbackContext):
+    # dict.copy() is a single C call, so the worker threads can't change
+    # fields halfway through building the reply
+    st = bot_status.copy()
     msg = (
         "📊 *Bot Status:*\n"
-        f"🏃 Running: {'✅ Yes' if bot_status['is_running'] else '❌ No'}\n"
+        f"🏃 Running: {'✅ Yes' if st['is_running'] else '❌ No'}\n"
         f"🎯 Target: {AUTOZ_TARGET or 'Not set'}\n"
-        f"📹 Videos Posted: {bot_status['videos_posted']}\n"
-        f"🕒 Last Post: {bot_status['last_post_time'] or 'N/A'}\n"
-        f"⏳ Next Post In: {bot_status['next_post_in']} sec\n"
-        f"📡 Last Ping: {bot_status['last_ping'] or 'N/A'}\n"
-        f"💥 Last Error: {bot_status['last_error'] or 'None'}\n"
-        f"🔁 Ping Interval: {bot_status['ping_interval']} sec\n"
+        f"📹 Videos Posted: {st['videos_posted']}\n"
+        f"📦 Upload Queue: {_upload_q.qsize()}\n"
+        f"🕒 Last Post: {st['last_post_time'] or 'N/A'}\n"
+        f"⏳ Next Post In: {st['next_post_in']} sec\n"
+        f"📡 Last Ping: {st['last_ping'] or 'N/A'}\n"
+        f"💥 Last Error: {st['last_error'] or 'None'}\n"
+        f"🔁 Ping Interval: {st['ping_interval']} sec\n"
     )
     update.message.reply_text(msg, parse_mode="Markdown")
 
 def ping(update: Update, context: CallbackContext):
     try:
-        res = requests.get(MY_RENDER_URL)
+        res = SESSION.get(MY_RENDER_URL, timeout=15)
         update.message.reply_text(f"✅ Ping OK ({res.status_code})")
     except Exception as e:
         update.message.reply_text(f"⚠️ Ping failed: {e}")
 
-# ==========================
-# TELEGRAM BOT RUNNER
-# ==========================
-def run_bot():
-    updater = Updater(BOT_TOKEN, use_context=True)
-    dp = updater.dispatcher
-    dp.add_handler(CommandHandler("start", start))
-    dp.add_handler(CommandHandler("settarget", settarget))
-    dp.add_handler(CommandHandler("start_auto", start_auto))
-    dp.add_handler(CommandHandler("stop_auto", stop_auto))
-    dp.add_handler(CommandHandler("setinterval", setinterval))
-    dp.add_handler(CommandHandler("status", status))
-    dp.add_handler(CommandHandler("ping", ping))
-    print("🤖 Telegram Bot Started")
-    updater.start_polling()
-    updater.idle()
-
-run_bot()
+# Most used first: the dispatcher tries handlers in registration order
+COMMANDS = [
+    ("status", status),
+    ("start", start),
+    ("settarget", settarget),
+    ("start_auto", start_auto),
+    ("stop_auto", stop_auto),
+    ("setinterval", setinterval),
+    ("ping", ping),
+]
 
 # ==========================
-# FLASK KEEP-ALIVE
+# FLASK KEEP-ALIVE + WEBHOOK
 # ==========================
+dispatcher = None
+
 @app.route('/')
 def home():
     return "✅ InstaAutomation is Live!"
 
+@app.route('/' + BOT_TOKEN, methods=['POST'])
+def wh():
+    upd = Update.de_json(request.get_json(force=True), dispatcher.bot)
+    dispatcher.process_update(upd)
+    return "ok"
+
+def run_flask():
+    # waitress: bounded thread pool instead of the Werkzeug dev server
+    serve(app, host='0.0.0.0', port=PORT, threads=16, connection_limit=200, channel_timeout=30)
+
+# ==========================
+# TELEGRAM BOT RUNNER
+# ==========================
+def run_bot():
+    global dispatcher
+    updater = Updater(
+        BOT_TOKEN,
+        use_context=True,
+        request_kwargs={"con_pool_size": 16, "read_timeout": 20, "connect_timeout": 10}
+    )
+    dispatcher = dp = updater.dispatcher
+    for name, fn in COMMANDS:
+        dp.add_handler(CommandHandler(name, fn))
+    if WEBHOOK_URL:
+        # Flask is the only ingress: Telegram pushes updates to wh()
+        url = f"{WEBHOOK_URL}/{BOT_TOKEN}"
+        max_connections = 40
+        allowed_updates = ["message"]
+        # Ask Telegram what is registered rather than trusting local state:
+        # another instance polling with this token deletes the webhook
+        info = updater.bot.get_webhook_info()
+        if (info.url == url and info.max_connections == max_connections
+                and (info.allowed_updates or []) == allowed_updates):
+            print("✅ Webhook already registered")
+        else:
+            updater.bot.set_webhook(url=url, max_connections=max_connections, allowed_updates=allowed_updates)
+        print("🤖 Telegram Bot Started (webhook)")
+        run_flask()
+    else:
+        threading.Thread(target=run_flask, daemon=True).start()
+        print("🤖 Telegram Bot Started (polling)")
+        # Long polling: Telegram holds getUpdates open until updates arrive
+        updater.start_polling(timeout=50, read_latency=5.0, allowed_updates=["message"])
+        # updater.idle() can only run on the main thread; block on an Event
+        # instead and hook the signals only when we are on the main thread
+        shutdown = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *a: shutdown.set())
+            signal.signal(signal.SIGINT, lambda *a: shutdown.set())
+        shutdown.wait()
+        updater.stop()
+
 if __name__ == '__main__':
     print("🚀 InstaAutomation Booting...")
-    app.run(host='0.0.0.0', port=10000)
-
+    run_bot()